@@ -52,32 +52,97 @@ a shortcut to the Documents directory added to the favorites bar::
     `on_submit`:
         Fired when a file has been selected with a double-tap.
 
+Setting :attr:`~FileBrowser.session_file` makes the browser remember where
+it was between runs. The last path, the expanded links, the recently visited
+directories and a snapshot of the links bar are written to that file and the
+next FileBrowser created with it starts from the saved state, refreshing the
+links bar in the background::
+
+    browser = FileBrowser(session_file=os.path.join(App.get_running_app().
+                          user_data_dir, 'filebrowser.json'))
+
+The folders of the files picked with `Select` or a double-tap are ranked by
+how often and how recently they were picked, and the best ranked ones are
+shown in the `Recent` section of the links bar, see :class:`FrecencyStore`.
+The ranking is kept across runs only when a session file is set.
+
+The views can be browsed with the keyboard: the arrow, page and home/end keys
+move the selection, `Enter` opens the selected directory or submits the
+selected file, and typing the start of a name selects the first matching
+entry, see :meth:`~FileBrowser.jump_to`.
+
+On devices with little memory, :attr:`~FileBrowser.memory_budget` bounds the
+memory used by the browser caches and the links bar, see
+:meth:`~FileBrowser.memory_usage`.
+
+When the app runs in an asyncio loop, see :func:`~kivy.app.async_runTouchApp`,
+the browser can be driven from coroutines with :meth:`~FileBrowser.navigate`,
+:meth:`~FileBrowser.result` and :meth:`~FileBrowser.iter_listing`::
+
+    async def pick(browser):
+        await browser.navigate(user_path)
+        selection = await browser.result()
+        if selection is not None:
+            print(selection)
+
+    async def main():
+        browser = FileBrowser()
+        await asyncio.gather(
+            async_runTouchApp(browser, async_lib='asyncio'), pick(browser))
+
+    asyncio.run(main())
+
 .. image:: _static/filebrowser.png
     :align: right
 '''
 
-__all__ = ('FileBrowser', )
+__all__ = ('FileBrowser', 'FileSystemBackend', 'FileSystemScandir',
+           'FileSystemArchive', 'FileSystemMemory')
 __version__ = '1.1-dev'
 
 from kivy.uix.boxlayout import BoxLayout
+from kivy.core.image import Image as CoreImage, ImageLoader
 from kivy.uix.treeview import TreeViewLabel, TreeView
 from kivy.uix.filechooser import FileChooserIconView as IconView
+from kivy.uix.filechooser import FileSystemAbstract, FileSystemLocal
 try:
     from kivy.garden.filechooserthumbview import FileChooserThumbView as\
     IconView
 except:
     pass
 from kivy.properties import (ObjectProperty, StringProperty, OptionProperty,
-                             ListProperty, BooleanProperty)
+                             ListProperty, BooleanProperty, NumericProperty)
 from kivy.lang import Builder
 from kivy.utils import platform
 from kivy.clock import Clock
 from kivy.compat import PY2
+from kivy.logger import Logger
+import asyncio
+import codecs
+import errno
+import io
+import json
+import math
+import posixpath
 import string
-from os.path import sep, dirname, expanduser, isdir, join
-from os import walk
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from bisect import bisect_left, insort
+from collections import namedtuple, OrderedDict
+from os.path import (sep, dirname, expanduser, isdir, join, abspath,
+                     basename, splitext, realpath)
+from os import walk, fdopen, remove, replace, stat as os_stat
+from stat import S_ISDIR
 from sys import getfilesystemencoding
 from functools import partial
+try:
+    from os import scandir as _scandir
+except ImportError:
+    _scandir = None
 
 if platform == 'win':
     from ctypes import windll, create_unicode_buffer
@@ -130,6 +195,847 @@ def get_drives():
                 drives.append((vol + sep + drive, drive))
     return drives
 
+
+def get_libraries():
+    user_path = get_home_directory()
+    libs = []
+    places = ('Documents', 'Music', 'Pictures', 'Videos')
+    for place in places:
+        if isdir(join(user_path, place)):
+            libs.append((join(user_path, place), place))
+    return libs
+
+
+SESSION_VERSION = 1
+'''Version of the format written by :func:`save_session`. Session files with
+a different version are ignored.
+'''
+
+SESSION_MAX_RECENT = 20
+'''Maximum number of recently visited directories kept in a session.
+'''
+
+SESSION_MAX_NODES = 200
+'''Maximum number of links bar directories whose listing is kept in a
+session snapshot.
+'''
+
+SESSION_MAX_CHILDREN = 500
+'''Maximum number of sub directories kept per snapshot entry.
+'''
+
+
+def _is_str_list(value):
+    return isinstance(value, list) and all(isinstance(item, str)
+                                           for item in value)
+
+
+def _is_pair_list(value, second_type):
+    return isinstance(value, list) and all(
+        isinstance(item, list) and len(item) == 2 and
+        isinstance(item[0], str) and isinstance(item[1], second_type)
+        for item in value)
+
+
+def _is_score_list(value):
+    # json accepts NaN and Infinity, which would break the sorted scores
+    return _is_pair_list(value, (int, float)) and all(
+        math.isfinite(score) for path, score in value)
+
+
+# validators of the fields of a session
+_SESSION_FIELDS = {
+    'path': lambda value: isinstance(value, str),
+    'recent': _is_str_list,
+    'expanded': _is_str_list,
+    'tree': lambda value: isinstance(value, dict) and all(
+        _is_str_list(names) for names in value.values()),
+    'libraries': lambda value: _is_pair_list(value, str),
+    'drives': lambda value: _is_pair_list(value, str),
+    'frecent': _is_score_list}
+
+
+def load_session(filename):
+    '''Returns the state saved in `filename` by :func:`save_session`. An empty
+    dict is returned if the file is missing, corrupt or was written with
+    another :data:`SESSION_VERSION`.
+    '''
+    try:
+        with open(filename) as fh:
+            state = json.load(fh)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get('version') != SESSION_VERSION:
+        return {}
+    for key, valid in _SESSION_FIELDS.items():
+        if key in state and not valid(state[key]):
+            return {}
+    return state
+
+
+def save_session(filename, state):
+    '''Writes the dict `state` to `filename`. The data is written to a
+    temporary file next to `filename` first, which then replaces it, so an
+    interrupted write never leaves a truncated session behind.
+    '''
+    state = dict(state, version=SESSION_VERSION)
+    fd, tmp = tempfile.mkstemp(prefix='.filebrowser', suffix='.tmp',
+                               dir=dirname(abspath(filename)))
+    try:
+        with fdopen(fd, 'w') as fh:
+            json.dump(state, fh)
+        replace(tmp, filename)
+    except (IOError, OSError):
+        try:
+            remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class FrecencyStore(object):
+    '''Ranks paths by frecency, a mix of how often and how recently they were
+    used. Every use of a path adds a weight that halves every `half_life`
+    seconds.
+
+    The score is stored as the log of the weights scaled to time 0, so the
+    ranking of paths doesn't change with time and the paths can be kept
+    sorted. Adding a use bisects the sorted entries and :meth:`top` is a
+    slice of them. At most `max_entries` paths are kept, the lowest ranked
+    are forgotten first.
+
+    `entries` is a list as returned by :meth:`to_list`.
+    '''
+
+    def __init__(self, entries=(), half_life=3 * 86400., max_entries=100):
+        self._rate = math.log(2) / half_life
+        self.max_entries = max_entries
+        self._scores = {}
+        self._ranked = []
+        for path, score in entries:
+            self._scores[path] = score
+            self._ranked.append((score, path))
+        self._ranked.sort()
+        self._trim()
+
+    def __len__(self):
+        return len(self._ranked)
+
+    def __contains__(self, path):
+        return path in self._scores
+
+    def add(self, path, timestamp=None):
+        '''Records a use of `path` at `timestamp`, defaulting to now.
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+        score = timestamp * self._rate
+        old = self._scores.get(path)
+        if old is not None:
+            self._discard(path)
+            # log(exp(old) + exp(score)), without overflowing
+            high, low = max(old, score), min(old, score)
+            score = high + math.log1p(math.exp(low - high))
+        self._scores[path] = score
+        insort(self._ranked, (score, path))
+        self._trim()
+
+    def remove(self, path):
+        '''Forgets `path`, if it was recorded.
+        '''
+        if path in self._scores:
+            self._discard(path)
+
+    def top(self, k):
+        '''Returns the `k` best ranked paths, best first.
+        '''
+        if k <= 0:
+            return []
+        return [path for score, path in self._ranked[:-k - 1:-1]]
+
+    def to_list(self):
+        '''Returns the entries as a json serializable list.
+        '''
+        return [[path, score] for score, path in self._ranked]
+
+    def _discard(self, path):
+        score = self._scores.pop(path)
+        ranked = self._ranked
+        del ranked[bisect_left(ranked, (score, path))]
+
+    def _trim(self):
+        while len(self._ranked) > self.max_entries:
+            score, path = self._ranked.pop(0)
+            del self._scores[path]
+
+
+def _missing_dirs(file_system, paths):
+    return [path for path in paths if not file_system.is_dir(path)]
+
+
+def _folders(file_system, paths):
+    return [path if file_system.is_dir(path) else dirname(path)
+            for path in paths]
+
+
+def _existing_links(file_system, links):
+    return [(path, name) for path, name in links if file_system.is_dir(path)]
+
+
+def _run_in_thread(func, callback, *largs):
+    # calls func(*largs) in a daemon thread and schedules callback with its
+    # result on the main thread
+    def run():
+        result = func(*largs)
+        Clock.schedule_once(lambda dt: callback(result))
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+def _call_or_none(func, *largs):
+    try:
+        return func(*largs)
+    except (IOError, OSError):
+        return None
+
+
+FileStat = namedtuple('FileStat', ('size', 'mtime', 'is_dir'))
+'''Result of :meth:`FileSystemBackend.stat`.
+'''
+
+
+class FileSystemBackend(FileSystemAbstract):
+    '''Base class of the file systems the browser can show, set with
+    :attr:`FileBrowser.file_system`. It extends the kivy
+    :class:`~kivy.uix.filechooser.FileSystemAbstract`, used by the file
+    views, with the methods used by the links bar.
+
+    The default implementations are built on
+    :meth:`~kivy.uix.filechooser.FileSystemAbstract.listdir` and
+    :meth:`~kivy.uix.filechooser.FileSystemAbstract.is_dir`; subclasses
+    usually override them with something faster.
+    '''
+
+    def scandir(self, fn):
+        '''Return a list of `(name, is_dir)` tuples for the entries of the
+        directory `fn`.
+        '''
+        return list(self.iscandir(fn))
+
+    def iscandir(self, fn):
+        '''Like :meth:`scandir`, but returns an iterator. Backends that can
+        list a directory incrementally yield the entries as they are read.
+        '''
+        for name in self.listdir(fn):
+            yield name, self.is_dir(join(fn, name))
+
+    def stat(self, fn):
+        '''Return the :data:`FileStat` of `fn`.
+        '''
+        is_dir = self.is_dir(fn)
+        return FileStat(0 if is_dir else self.getsize(fn), 0, is_dir)
+
+    def list_dirs(self, fn):
+        '''Return the names of the sub directories of the directory `fn`.
+        '''
+        return [name for name, is_dir in self.scandir(fn) if is_dir]
+
+    def open(self, fn):
+        '''Return a binary file object reading the file `fn`. Raises an
+        :class:`IOError` if the file system can't read files, as by default.
+        '''
+        raise IOError(errno.EOPNOTSUPP, 'Reading files is not supported', fn)
+
+    def get_drives(self):
+        '''Return the `(path, name)` tuples shown in the `Computer` section
+        of the links bar.
+        '''
+        return [(sep, sep)]
+
+    def get_libraries(self):
+        '''Return the `(path, name)` tuples shown in the `Libraries`
+        section of the links bar.
+        '''
+        return []
+
+    def scandir_async(self, fn, callback):
+        '''Like :meth:`scandir`, but lists `fn` in a thread and calls
+        `callback(fn, entries)` on the main thread, with `entries` None if
+        `fn` couldn't be listed.
+        '''
+        _run_in_thread(_call_or_none, partial(callback, fn), self.scandir, fn)
+
+    def stat_async(self, fn, callback):
+        '''Like :meth:`stat`, but calls `callback(fn, stat)` on the main
+        thread, with `stat` None if `fn` couldn't be accessed.
+        '''
+        _run_in_thread(_call_or_none, partial(callback, fn), self.stat, fn)
+
+    def watch(self, fn, callback, interval=2.):
+        '''Polls the directory `fn` every `interval` seconds and calls
+        `callback(fn)` when its entries changed. Returns the
+        :class:`~kivy.clock.ClockEvent` of the polling, cancel it to stop
+        watching.
+        '''
+        listing = []
+        # a slow or hung mount must not pile up scans, a poll is skipped
+        # while the previous scan is pending
+        pending = [False]
+
+        def compare(fn, entries):
+            pending[0] = False
+            entries = sorted(entries or [])
+            if listing and listing[0] != entries:
+                callback(fn)
+            listing[:] = [entries]
+
+        def poll(*largs):
+            if pending[0]:
+                return
+            pending[0] = True
+            self.scandir_async(fn, compare)
+
+        poll()
+        return Clock.schedule_interval(poll, interval)
+
+
+class FileSystemScandir(FileSystemLocal, FileSystemBackend):
+    '''The local file system, listed with :func:`os.scandir` which gets the
+    type of the entries without a stat call per entry on most platforms.
+    '''
+
+    def iscandir(self, fn):
+        if _scandir is None:
+            for entry in super(FileSystemScandir, self).iscandir(fn):
+                yield entry
+            return
+        # closes the directory even if the iteration is stopped early
+        with _scandir(fn) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                yield entry.name, is_dir
+
+    def stat(self, fn):
+        st = os_stat(fn)
+        return FileStat(st.st_size, st.st_mtime, S_ISDIR(st.st_mode))
+
+    def open(self, fn):
+        return io.open(fn, 'rb')
+
+    def get_drives(self):
+        return get_drives()
+
+    def get_libraries(self):
+        return get_libraries()
+
+
+class _IndexedFileSystem(FileSystemBackend):
+    # a file system whose entries are all kept in memory, as a dict of
+    # directory path -> {name: FileStat}. Paths are posix paths from '/'.
+
+    def __init__(self):
+        super(_IndexedFileSystem, self).__init__()
+        self._index = {'/': {}}
+
+    @staticmethod
+    def _norm(fn):
+        return posixpath.normpath('/' + fn.replace(sep, '/').strip('/'))
+
+    def _add_dir(self, path):
+        path = self._norm(path)
+        if path in self._index:
+            return
+        parent, name = posixpath.split(path)
+        self._add_dir(parent)
+        self._index[parent][name] = FileStat(0, 0, True)
+        self._index[path] = {}
+
+    def _add_file(self, path, stat):
+        parent, name = posixpath.split(self._norm(path))
+        self._add_dir(parent)
+        self._index[parent][name] = stat
+
+    def _children(self, fn):
+        try:
+            return self._index[self._norm(fn)]
+        except KeyError:
+            raise OSError(errno.ENOENT, 'No such directory', fn)
+
+    def listdir(self, fn):
+        return list(self._children(fn))
+
+    def iscandir(self, fn):
+        return iter(self.scandir(fn))
+
+    def scandir(self, fn):
+        return [(name, st.is_dir) for name, st in self._children(fn).items()]
+
+    def stat(self, fn):
+        path = self._norm(fn)
+        if path == '/':
+            return FileStat(0, 0, True)
+        parent, name = posixpath.split(path)
+        try:
+            return self._index[parent][name]
+        except KeyError:
+            raise OSError(errno.ENOENT, 'No such file', fn)
+
+    def getsize(self, fn):
+        return self.stat(fn).size
+
+    def is_hidden(self, fn):
+        return posixpath.basename(self._norm(fn)).startswith('.')
+
+    def is_dir(self, fn):
+        return self._norm(fn) in self._index
+
+
+class FileSystemArchive(_IndexedFileSystem):
+    '''Browses the content of the zip or tar archive `filename`, with the
+    archive root as `/`. The archive members are indexed in memory once,
+    when the file system is created, so browsing never reads the archive
+    directory again.
+    '''
+
+    def __init__(self, filename):
+        super(FileSystemArchive, self).__init__()
+        self.filename = filename
+        # archive member of the files, by path
+        self._members = {}
+        if zipfile.is_zipfile(filename):
+            self._archive = zipfile.ZipFile(filename)
+            for info in self._archive.infolist():
+                if info.filename.endswith('/'):
+                    self._add_dir(info.filename)
+                else:
+                    mtime = time.mktime(info.date_time + (0, 0, -1))
+                    self._add_file(info.filename,
+                                   FileStat(info.file_size, mtime, False))
+                    self._members[self._norm(info.filename)] = info
+        else:
+            self._archive = tarfile.open(filename)
+            for info in self._archive.getmembers():
+                if info.isdir():
+                    self._add_dir(info.name)
+                else:
+                    self._add_file(info.name,
+                                   FileStat(info.size, info.mtime, False))
+                    self._members[self._norm(info.name)] = info
+
+    def open(self, fn):
+        try:
+            member = self._members[self._norm(fn)]
+        except KeyError:
+            raise IOError(errno.ENOENT, 'No such file', fn)
+        if isinstance(self._archive, zipfile.ZipFile):
+            return self._archive.open(member)
+        return self._archive.extractfile(member)
+
+
+class FileSystemMemory(_IndexedFileSystem):
+    '''A file system kept in memory, e.g. for tests and benchmarks. `files`
+    is a dict of file path to file content, a `None` content makes the path a
+    directory.
+    '''
+
+    def __init__(self, files=None):
+        super(FileSystemMemory, self).__init__()
+        self._data = {}
+        for path, data in (files or {}).items():
+            if data is None:
+                self.add_dir(path)
+            else:
+                self.add_file(path, data)
+
+    def add_dir(self, path):
+        '''Adds the directory `path`, and its missing parents.
+        '''
+        self._add_dir(path)
+
+    def add_file(self, path, data=b''):
+        '''Adds the file `path` with content `data`.
+        '''
+        self._data[self._norm(path)] = data
+        self._add_file(path, FileStat(len(data), time.time(), False))
+
+    def open(self, fn):
+        try:
+            return io.BytesIO(self._data[self._norm(fn)])
+        except KeyError:
+            raise IOError(errno.ENOENT, 'No such file', fn)
+
+
+PREVIEW_HEAD_SIZE = 4096
+'''Number of bytes read from the start of a file to preview it as text.
+'''
+
+PREVIEW_HEX_SIZE = 256
+'''Number of bytes shown when previewing a binary file.
+'''
+
+PREVIEW_MAX_IMAGE_SIZE = 8 * 1024 * 1024
+'''Images larger than this many bytes aren't previewed as images.
+'''
+
+PREVIEW_IMAGE_EXTS = ('png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga', 'webp')
+'''Extensions of the files previewed as images.
+'''
+
+PREVIEW_DELAY = .1
+'''Seconds the selection must stay on a file before its preview is loaded.
+'''
+
+PREVIEW_CACHE_SIZE = 16 * 1024 * 1024
+'''Default maximum number of bytes of cached previews, see
+:attr:`FileBrowser.memory_budget`.
+'''
+
+
+def _hexdump(data):
+    lines = []
+    for offset in range(0, len(data), 16):
+        line = bytearray(data[offset:offset + 16])
+        lines.append(u'{:08x}  {:<47}  {}'.format(
+            offset, u' '.join(u'{:02x}'.format(b) for b in line),
+            u''.join(chr(b) if 32 <= b < 127 else u'.' for b in line)))
+    return u'\n'.join(lines)
+
+
+def _decode_image(data, ext):
+    # decodes the image without creating its texture, which can only be done
+    # on the main thread, as kivy.loader does
+    for loader in ImageLoader.loaders:
+        if loader.can_load_memory() and ext in loader.extensions():
+            return loader('__inline__', ext=ext, rawdata=io.BytesIO(data),
+                          inline=True, nocache=True)
+    raise ValueError('No loader for {} images'.format(ext))
+
+
+class PreviewLoader(object):
+    '''Loads file previews in a worker thread. Only the latest requested
+    preview is loaded: a new :meth:`load` or a :meth:`cancel` stops the
+    pending one, in between the bounded reads of the file. The last previews
+    are kept in a LRU cache of at most `cache_size` bytes.
+
+    A preview is a dict with the `kind` of preview, one of 'dir', 'text',
+    'hex', 'image' or 'error', the :data:`FileStat` of the file as `stat`,
+    and the previewed content as `text`, or for images as the decoded
+    `image`, an :class:`~kivy.core.image.ImageLoaderBase` whose texture must
+    be created on the main thread, see :meth:`set_texture`.
+    '''
+
+    def __init__(self, cache_size=PREVIEW_CACHE_SIZE):
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_size = cache_size
+        self._cond = threading.Condition()
+        self._request = None
+        self._generation = 0
+        self._thread = None
+
+    def load(self, file_system, path, callback):
+        '''Loads the preview of `path` from `file_system` and calls
+        `callback(path, preview)` on the main thread, unless cancelled.
+        '''
+        with self._cond:
+            self._generation += 1
+            self._request = (self._generation, file_system, path, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self):
+        '''Cancels the pending preview, if any.
+        '''
+        with self._cond:
+            self._generation += 1
+            self._request = None
+
+    @property
+    def cache_bytes(self):
+        '''Number of bytes used by the cached previews, including the
+        textures of the images, see :meth:`set_texture`.
+        '''
+        return self._cache_bytes
+
+    @property
+    def cache_size(self):
+        '''Maximum number of bytes of cached previews, lowering it evicts the
+        oldest previews.
+        '''
+        return self._cache_size
+
+    @cache_size.setter
+    def cache_size(self, size):
+        with self._cond:
+            self._cache_size = size
+            self._evict()
+
+    def set_texture(self, preview, texture):
+        '''Replaces the decoded image of `preview` by its `texture`, whose
+        size then counts in the cache size.
+        '''
+        with self._cond:
+            preview['texture'] = texture
+            preview.pop('image', None)
+            if self._cache.get(preview['key']) is preview:
+                size = texture.width * texture.height * 4
+                self._cache_bytes += size - preview['size']
+                preview['size'] = size
+                self._evict()
+
+    def clear_cache(self):
+        '''Empties the preview cache.
+        '''
+        with self._cond:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def _cancelled(self, generation):
+        return generation != self._generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None:
+                    self._cond.wait()
+                generation, file_system, path, callback = self._request
+                self._request = None
+            try:
+                preview = self._load(generation, file_system, path)
+            except Exception as e:
+                # keep the worker alive whatever the file system raises
+                Logger.exception('FileBrowser: Unable to preview <%s>' % path)
+                preview = {'kind': 'error', 'stat': None, 'text': str(e)}
+            if preview is not None and not self._cancelled(generation):
+                Clock.schedule_once(partial(self._deliver, generation, path,
+                                            callback, preview))
+
+    def _deliver(self, generation, path, callback, preview, *largs):
+        if not self._cancelled(generation):
+            callback(path, preview)
+
+    def _load(self, generation, file_system, path):
+        try:
+            stat = file_system.stat(path)
+        except (IOError, OSError) as e:
+            return {'kind': 'error', 'stat': None, 'text': str(e)}
+        # equal paths of different file systems are different files
+        key = (file_system, path, stat.size, stat.mtime)
+        with self._cond:
+            preview = self._cache.pop(key, None)
+            if preview is not None:
+                self._cache[key] = preview
+                return preview
+
+        preview = {'kind': 'dir', 'stat': stat}
+        size = 0
+        if not stat.is_dir:
+            ext = splitext(path)[1][1:].lower()
+            image = (ext in PREVIEW_IMAGE_EXTS and
+                     stat.size <= PREVIEW_MAX_IMAGE_SIZE)
+            try:
+                data = self._read(generation, file_system, path,
+                                  stat.size if image else PREVIEW_HEAD_SIZE)
+            except (IOError, OSError) as e:
+                return {'kind': 'error', 'stat': stat, 'text': str(e)}
+            if data is None:
+                return None
+            size = len(data)
+            if image:
+                try:
+                    image = _decode_image(data, ext)
+                except Exception as e:
+                    return {'kind': 'error', 'stat': stat, 'text': str(e)}
+                size = image.width * image.height * 4
+                preview.update(kind='image', image=image)
+            else:
+                try:
+                    if b'\0' in data:
+                        raise ValueError()
+                    decoder = codecs.getincrementaldecoder('utf-8')()
+                    preview.update(kind='text', text=decoder.decode(data))
+                except ValueError:
+                    preview.update(kind='hex',
+                                   text=_hexdump(data[:PREVIEW_HEX_SIZE]))
+
+        with self._cond:
+            self._cache[key] = preview
+            self._cache_bytes += size
+            preview['key'] = key
+            preview['size'] = size
+            self._evict()
+        return preview
+
+    def _evict(self):
+        while self._cache_bytes > self.cache_size and self._cache:
+            self._cache_bytes -= self._cache.popitem(False)[1]['size']
+
+    def _read(self, generation, file_system, path, size):
+        # reads up to size bytes, returns None if cancelled meanwhile
+        chunks = []
+        with file_system.open(path) as fh:
+            while size > 0:
+                if self._cancelled(generation):
+                    return None
+                chunk = fh.read(min(size, 65536))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size -= len(chunk)
+        return b''.join(chunks)
+
+
+class FilePreview(BoxLayout):
+    '''Shows a preview of the file :attr:`path`, loaded in the background by
+    a :class:`PreviewLoader`. Images are shown as images, text files as the
+    start of their text and other files as a hex dump of their first bytes.
+    '''
+
+    path = StringProperty('')
+    '''Path of the previewed file, '' for none.
+
+    :class:`~kivy.properties.StringProperty`, defaults to ''
+    '''
+
+    file_system = ObjectProperty(None)
+    '''The :class:`FileSystemBackend` :attr:`path` is read from.
+
+    :class:`~kivy.properties.ObjectProperty`, defaults to None
+    '''
+
+    text = StringProperty('')
+    '''Read-only, the text or hex dump previewed.
+    '''
+
+    texture = ObjectProperty(None, allownone=True)
+    '''Read-only, the texture of the previewed image.
+    '''
+
+    metadata = StringProperty('')
+    '''Read-only, description of the previewed file.
+    '''
+
+    def __init__(self, **kwargs):
+        self.loader = PreviewLoader()
+        self._trigger_load = Clock.create_trigger(self._load, PREVIEW_DELAY)
+        super(FilePreview, self).__init__(**kwargs)
+
+    def on_path(self, instance, path):
+        self.text = ''
+        self.texture = None
+        self.metadata = basename(path)
+        self.loader.cancel()
+        if path and self.file_system is not None:
+            self._trigger_load()
+        else:
+            self._trigger_load.cancel()
+
+    def _load(self, *largs):
+        self.loader.load(self.file_system, self.path, self._show)
+
+    def _show(self, path, preview):
+        if path != self.path:
+            return
+        kind = preview['kind']
+        stat = preview['stat']
+        lines = [basename(path)]
+        if kind == 'image':
+            texture = preview.get('texture')
+            if texture is None:
+                try:
+                    texture = CoreImage(preview['image']).texture
+                except Exception:
+                    Logger.exception('FileBrowser: Unable to preview <%s>'
+                                     % path)
+                else:
+                    self.loader.set_texture(preview, texture)
+            self.texture = texture
+            if texture is not None:
+                lines.append(u'{} x {}'.format(*texture.size))
+        else:
+            self.text = preview.get('text', '')
+        if kind == 'dir':
+            lines.append('Folder')
+        elif stat is not None:
+            lines.append(u'{} bytes'.format(stat.size))
+        if stat is not None and stat.mtime:
+            lines.append(time.strftime('%Y-%m-%d %H:%M',
+                                       time.localtime(stat.mtime)))
+        self.metadata = u'\n'.join(lines)
+
+
+WIDGET_SIZE = 2048
+'''Estimated number of bytes used by a widget, its properties and its canvas
+instructions, without its textures, see :meth:`FileBrowser.memory_usage`.
+'''
+
+
+def _widgets_size(widgets):
+    # the size of the widgets and their children; the textures are measured,
+    # a texture shared by several widgets, e.g. an atlas, is counted once
+    size = 0
+    textures = set()
+    for widget in widgets:
+        for child in widget.walk(restrict=True):
+            size += WIDGET_SIZE
+            texture = getattr(child, 'texture', None)
+            if texture is None:
+                continue
+            texture = getattr(texture, 'owner', None) or texture
+            if texture not in textures:
+                textures.add(texture)
+                size += texture.width * texture.height * 4
+    return size
+
+
+TYPEAHEAD_TIMEOUT = 1.
+'''Seconds after which the typed name prefix is reset.
+'''
+
+
+def _parent_entry(path):
+    # path of the first entry of the views, going to the parent of path, as
+    # set by FileChooserController: '../', or the full parent path on Windows
+    if platform != 'win':
+        return '..' + sep
+    parent = path[:path.rfind(sep)]
+    return parent if sep in parent else parent + sep
+
+
+class _NameIndex(object):
+    # casefolded names of the files of a view, sorted so that the first name
+    # starting with a prefix is found by bisection, and the position of each
+    # path in the view files. The entry going to the parent directory, if
+    # any, isn't indexed and `first` is the position of the first file.
+
+    def __init__(self, files, directory):
+        self.positions = dict((path, i) for i, path in enumerate(files))
+        self.first = int(bool(files) and files[0] == _parent_entry(directory))
+        names = sorted((basename(path.rstrip(sep)).casefold(), path)
+                       for path in files[self.first:])
+        self.names = tuple(name for name, path in names)
+        self.paths = tuple(path for name, path in names)
+
+    def get_size(self):
+        return (sys.getsizeof(self.positions) + sys.getsizeof(self.names) +
+                sys.getsizeof(self.paths) +
+                sum(sys.getsizeof(name) for name in self.names))
+
+    def find(self, prefix):
+        i = bisect_left(self.names, prefix)
+        if i < len(self.names) and self.names[i].startswith(prefix):
+            return self.paths[i]
+        return None
+
+
 class FileBrowserIconView(IconView):
     pass
 
@@ -143,7 +1049,32 @@ Builder.load_string('''
         self.parent.browser.current_tab.content.path = self.path if\
         self.collide_point(*args[1].pos) and self.path else\
         self.parent.browser.current_tab.content.path
-    on_is_open: self.is_open and self.parent.trigger_populate(self)
+    on_is_open:
+        self.is_open and self.parent and self.parent.trigger_populate(self)
+
+<FilePreview>:
+    orientation: 'vertical'
+    spacing: 5
+    Image:
+        texture: root.texture
+        size_hint_y: 1 if root.texture else None
+        height: 0
+        opacity: 1 if root.texture else 0
+    ScrollView:
+        size_hint_y: 1 if root.text else None
+        height: 0
+        Label:
+            text: root.text
+            font_name: 'RobotoMono-Regular'
+            font_size: '11sp'
+            size_hint_y: None
+            height: self.texture_size[1]
+            text_size: self.width, None
+    Label:
+        size_hint_y: None
+        height: self.texture_size[1]
+        text_size: self.width, None
+        text: root.metadata
 
 <FileBrowser>:
     orientation: 'vertical'
@@ -165,6 +1096,7 @@ Builder.load_string('''
                 LinkTree:
                     id: link_tree
                     browser: tabbed_browser
+                    file_system: root.file_system
                     size_hint_y: None
                     height: self.minimum_height
                     on_parent: self.fill_tree(root.favorites)
@@ -179,33 +1111,38 @@ Builder.load_string('''
                 padding_x: '10dp'
                 text: abspath(root.path)
                 valign: 'middle'
-            TabbedPanel:
-                id: tabbed_browser
-                do_default_tab: False
-                TabbedPanelItem:
-                    text: 'List View'
-                    FileChooserListView:
-                        id: list_view
-                        path: root.path
-                        filters: root.filters
-                        filter_dirs: root.filter_dirs
-                        show_hidden: root.show_hidden
-                        multiselect: root.multiselect
-                        dirselect: root.dirselect
-                        rootpath: root.rootpath
-                        on_submit: root.dispatch('on_submit')
-                TabbedPanelItem:
-                    text: 'Icon View'
-                    FileBrowserIconView:
-                        id: icon_view
-                        path: root.path
-                        filters: root.filters
-                        filter_dirs: root.filter_dirs
-                        show_hidden: root.show_hidden
-                        multiselect: root.multiselect
-                        dirselect: root.dirselect
-                        rootpath: root.rootpath
-                        on_submit: root.dispatch('on_submit')
+            BoxLayout:
+                id: view_box
+                spacing: 5
+                TabbedPanel:
+                    id: tabbed_browser
+                    do_default_tab: False
+                    TabbedPanelItem:
+                        text: 'List View'
+                        FileChooserListView:
+                            id: list_view
+                            path: root.path
+                            filters: root.filters
+                            filter_dirs: root.filter_dirs
+                            show_hidden: root.show_hidden
+                            multiselect: root.multiselect
+                            dirselect: root.dirselect
+                            rootpath: root.rootpath
+                            file_system: root.file_system
+                            on_submit: root.dispatch('on_submit')
+                    TabbedPanelItem:
+                        text: 'Icon View'
+                        FileBrowserIconView:
+                            id: icon_view
+                            path: root.path
+                            filters: root.filters
+                            filter_dirs: root.filter_dirs
+                            show_hidden: root.show_hidden
+                            multiselect: root.multiselect
+                            dirselect: root.dirselect
+                            rootpath: root.rootpath
+                            file_system: root.file_system
+                            on_submit: root.dispatch('on_submit')
     GridLayout:
         size_hint: (1, None)
         height: file_text.line_height * 4
@@ -252,37 +1189,106 @@ class TreeLabel(TreeViewLabel):
 class LinkTree(TreeView):
     # link to the favorites section of link bar
     _favs = ObjectProperty(None)
+    file_system = ObjectProperty(None)
+    _recent = None
+    _libs = None
     _computer_node = None
+    # whether libraries and drives were probed, or still come from a session
+    _probed = False
+    # incremented on each reload_favs, to drop the results of older probes
+    _favs_generation = 0
+
+    def __init__(self, **kwargs):
+        # sub directories of the links, by path, and the paths of the links
+        # still to be expanded, both restored from a session
+        self._snapshot = {}
+        self._expanded = set()
+        self._libraries = []
+        self._drives = []
+        super(LinkTree, self).__init__(**kwargs)
 
     def fill_tree(self, fav_list):
-        user_path = get_home_directory()
         self._favs = self.add_node(TreeLabel(text='Favorites', is_open=True,
                                              no_selection=True))
         self.reload_favs(fav_list)
 
-        libs = self.add_node(TreeLabel(text='Libraries', is_open=True,
-                                       no_selection=True))
-        places = ('Documents', 'Music', 'Pictures', 'Videos')
-        for place in places:
-            if isdir(join(user_path, place)):
-                self.add_node(TreeLabel(text=place, path=join(user_path,
-                                        place)), libs)
+        self._recent = self.add_node(TreeLabel(text='Recent', is_open=True,
+                                               no_selection=True))
+
+        self._libs = self.add_node(TreeLabel(text='Libraries', is_open=True,
+                                             no_selection=True))
         self._computer_node = self.add_node(TreeLabel(text='Computer',\
         is_open=True, no_selection=True))
         self._computer_node.bind(on_touch_down=self._drives_touch)
-        self.reload_drives()
+        # probe the disks in the background, so slow or cold mounts don't
+        # stall the first frame
+        _run_in_thread(self._probe, self._apply_probe, self.file_system)
+
+    def apply_session(self, session):
+        '''Restores the state of the links bar saved in a session, see
+        :meth:`get_state`. The saved libraries and drives are only shown
+        until the disks have been probed.
+        '''
+        for path, names in session.get('tree', {}).items():
+            self._snapshot.setdefault(path, tuple(names))
+        self._expanded.update(session.get('expanded', []))
+        if not self._probed:
+            self.reload_libs(session.get('libraries', []))
+            self.reload_drives(session.get('drives', []))
+        for node in list(self.iterate_open_nodes()):
+            if isinstance(node, TreeLabel):
+                self._restore_expanded(node)
+
+    @staticmethod
+    def _probe(file_system):
+        return file_system.get_libraries(), file_system.get_drives()
+
+    def _apply_probe(self, result):
+        libs, drives = result
+        self._probed = True
+        self.reload_libs(libs)
+        self.reload_drives(drives)
+
+    def _add_link(self, text, path, parent):
+        node = self.add_node(TreeLabel(text=text, path=path), parent)
+        self._restore_expanded(node)
+        return node
+
+    def _restore_expanded(self, node):
+        if node.path in self._expanded:
+            self._expanded.discard(node.path)
+            if not node.is_open:
+                # the node may not be laid out yet, so populate it from here
+                self.toggle_node(node)
+                self.trigger_populate(node)
 
     def _drives_touch(self, obj, touch):
         if obj.collide_point(*touch.pos):
             self.reload_drives()
 
-    def reload_drives(self):
+    def reload_libs(self, libs=None):
+        if libs is None:
+            libs = self.file_system.get_libraries()
+        self._libraries = [list(lib) for lib in libs]
+        paths = [path for path, name in libs]
+        current = [node.path for node in self._libs.nodes]
+        for node in self._libs.nodes[:]:
+            if node.path not in paths:
+                self.remove_node(node)
+        for path, name in libs:
+            if path not in current:
+                self._add_link(name, path, self._libs)
+
+    def reload_drives(self, drives=None):
+        if drives is None:
+            drives = self.file_system.get_drives()
+        self._drives = [list(drive) for drive in drives]
         nodes = [(node, node.text + node.path) for node in\
                  self._computer_node.nodes if isinstance(node, TreeLabel)]
         sigs = [s[1] for s in nodes]
         nodes_new = []
         sig_new = []
-        for path, name in get_drives():
+        for path, name in drives:
             if platform == 'win':
                 text = u'{}({})'.format((name + ' ') if name else '', path)
             else:
@@ -294,11 +1300,22 @@ class LinkTree(TreeView):
                 self.remove_node(node)
         for text, path in nodes_new:
             if text + path + sep not in sigs:
-                self.add_node(TreeLabel(text=text, path=path + sep),
-                              self._computer_node)
+                self._add_link(text, path + sep, self._computer_node)
 
     def reload_favs(self, fav_list):
         user_path = get_home_directory()
+        places = ('Desktop', 'Downloads')
+        links = [(join(user_path, place), place) for place in places]
+        links.extend((path, name) for path, name in fav_list)
+        # the favorites may be on slow mounts, check them in the background
+        self._favs_generation += 1
+        _run_in_thread(_existing_links,
+                       partial(self._set_favs, self._favs_generation),
+                       self.file_system, links)
+
+    def _set_favs(self, generation, links):
+        if generation != self._favs_generation:
+            return
         favs = self._favs
         remove = []
         for node in self.iterate_all_nodes(favs):
@@ -306,24 +1323,100 @@ class LinkTree(TreeView):
                 remove.append(node)
         for node in remove:
             self.remove_node(node)
-        places = ('Desktop', 'Downloads')
-        for place in places:
-            if isdir(join(user_path, place)):
-                self.add_node(TreeLabel(text=place, path=join(user_path,
-                                        place)), favs)
-        for path, name in fav_list:
-            if isdir(path):
-                self.add_node(TreeLabel(text=name, path=path), favs)
+        for path, name in links:
+            self._add_link(name, path, favs)
+
+    def reload_recent(self, paths):
+        recent = self._recent
+        current = [node.path for node in recent.nodes]
+        for node in recent.nodes[:]:
+            if node.path not in paths:
+                self.remove_node(node)
+        for path in paths:
+            if path not in current:
+                self._add_link(basename(path.rstrip(sep)) or path, path,
+                               recent)
+        # keep the kept nodes, expanded or not, in the order of the ranking
+        order = dict((path, i) for i, path in enumerate(paths))
+        recent.nodes.sort(key=lambda node: order[node.path])
+        self._trigger_layout()
 
     def trigger_populate(self, node):
         if not node.path or node.nodes:
             return
         parent = node.path
-        _next = next(walk(parent))
-        if _next:
-            for path in _next[1]:
-                self.add_node(TreeLabel(text=path, path=parent + sep + path),
-                              node)
+        for name in self._snapshot.get(parent, []):
+            self._add_link(name, parent + sep + name, node)
+        self.file_system.scandir_async(parent, partial(self._populate, node))
+
+    def _populate(self, node, parent, entries):
+        names = tuple(name for name, is_dir in entries or [] if is_dir)
+        self._snapshot[parent] = names
+        current = [child.text for child in node.nodes]
+        for child in node.nodes[:]:
+            if child.text not in names:
+                self.remove_node(child)
+        for name in names:
+            if name not in current:
+                self._add_link(name, parent + sep + name, node)
+
+    def count_nodes(self):
+        '''Returns the number of nodes in the links bar.
+        '''
+        return sum(1 for node in self.iterate_all_nodes())
+
+    def get_size(self):
+        '''Returns the approximate number of bytes used by the nodes of the
+        links bar, including their textures.
+        '''
+        return _widgets_size(self.iterate_all_nodes())
+
+    def get_snapshot_size(self):
+        '''Returns the approximate number of bytes used by the cached
+        listings of the links.
+        '''
+        size = sys.getsizeof(self._snapshot)
+        for names in self._snapshot.values():
+            size += sys.getsizeof(names)
+            size += sum(sys.getsizeof(name) for name in names)
+        return size
+
+    def drop_snapshot(self):
+        '''Forgets the cached listings of the links that aren't expanded.
+        '''
+        expanded = set(node.path for node in self.iterate_all_nodes()
+                       if isinstance(node, TreeLabel) and node.is_open)
+        for path in list(self._snapshot):
+            if path not in expanded:
+                del self._snapshot[path]
+
+    def free_closed_nodes(self):
+        '''Removes the sub directories of the collapsed links, they are
+        listed again when the link is expanded.
+        '''
+        for node in list(self.iterate_open_nodes()):
+            if (isinstance(node, TreeLabel) and node.path and
+                    not node.is_open):
+                for child in node.nodes[:]:
+                    self.remove_node(child)
+
+    def get_state(self):
+        '''Returns the state of the links bar as saved in a session, see
+        :attr:`FileBrowser.session_file`.
+        '''
+        expanded = [node.path for node in self.iterate_all_nodes()
+                    if isinstance(node, TreeLabel) and node.path and
+                    node.is_open]
+        paths = expanded + [path for path in self._snapshot
+                            if path not in expanded]
+        tree = {}
+        for path in paths:
+            if len(tree) >= SESSION_MAX_NODES:
+                break
+            if path in self._snapshot:
+                tree[path] = list(self._snapshot[path][:SESSION_MAX_CHILDREN])
+        return {'expanded': expanded, 'tree': tree,
+                'libraries': self._libraries, 'drives': self._drives}
 
 
 class FileBrowser(BoxLayout):
@@ -464,20 +1557,160 @@ class FileBrowser(BoxLayout):
     defaults to '[]'.
     '''
 
+    session_file = StringProperty(None, allownone=True)
+    '''Path of the file the browser state is saved to, see
+    :func:`save_session`. It is read when it is set, and written shortly
+    after :attr:`path` changes as well as when `Select` or `Cancel` is
+    pressed. The saved path is only restored if it still exists and
+    :attr:`path` wasn't passed to the constructor. When None, the state is
+    not saved.
+
+    :data:`session_file` is an :class:`~kivy.properties.StringProperty`,
+    defaults to None.
+
+    .. versionadded:: 1.1
+    '''
+
+    recent_dirs = ListProperty([])
+    '''Read-only list of the most recently visited directories, latest
+    first. At most :data:`SESSION_MAX_RECENT` directories are kept.
+
+    :data:`recent_dirs` is an :class:`~kivy.properties.ListProperty`,
+    defaults to '[]'.
+
+    .. versionadded:: 1.1
+    '''
+
+    file_system = ObjectProperty(FileSystemScandir(),
+                                 baseclass=FileSystemBackend)
+    '''The file system shown by the browser, e.g. a
+    :class:`FileSystemArchive` to browse the content of an archive.
+
+    :data:`file_system` is an :class:`~kivy.properties.ObjectProperty`,
+    defaults to a :class:`FileSystemScandir` instance.
+
+    .. versionadded:: 1.1
+    '''
+
+    watch_interval = NumericProperty(0)
+    '''When positive, the current directory is polled every
+    :attr:`watch_interval` seconds with :meth:`FileSystemBackend.watch` and
+    the views are refreshed when its content changes.
+
+    :data:`watch_interval` is an :class:`~kivy.properties.NumericProperty`,
+    defaults to 0.
+
+    .. versionadded:: 1.1
+    '''
+
+    _watch = None
+
+    preview = BooleanProperty(False)
+    '''Whether a :class:`FilePreview` of the last selected file is shown
+    next to the views.
+
+    :data:`preview` is an :class:`~kivy.properties.BooleanProperty`,
+    defaults to False.
+
+    .. versionadded:: 1.1
+    '''
+
+    _preview_widget = None
+
+    keyboard_navigation = BooleanProperty(True)
+    '''Whether the views can be browsed with the keyboard, see the module
+    documentation. Keys are ignored while the filename or filter field has
+    the focus.
+
+    :data:`keyboard_navigation` is a
+    :class:`~kivy.properties.BooleanProperty`, defaults to True.
+
+    .. versionadded:: 1.1
+    '''
+
+    _typeahead = u''
+    _typeahead_time = 0
+    # whether trim_memory couldn't meet the budget, to only log it once
+    _over_budget = False
+    # the window the key handlers are bound to
+    _keyboard_window = None
+
+    memory_budget = NumericProperty(0)
+    '''Approximate maximum number of bytes used by the browser caches and
+    the links bar, see :meth:`memory_usage`. The entries of the views, which
+    can't be freed, don't count in it. The preview cache is limited to a
+    quarter of it, at most :data:`PREVIEW_CACHE_SIZE`. When it's exceeded,
+    :meth:`trim_memory` frees, until the budget is met, the name indexes of
+    the hidden views, the cached previews, the cached listings of the links,
+    the sub directories of the collapsed links and finally the name index of
+    the current view. If the expanded links still exceed it, it's logged.
+    0 means no limit.
+
+    :data:`memory_budget` is an :class:`~kivy.properties.NumericProperty`,
+    defaults to 0.
+
+    .. versionadded:: 1.1
+    '''
+
+    recent_limit = NumericProperty(5)
+    '''Maximum number of folders shown in the `Recent` section of the links
+    bar. The folders are ranked as the user picks files, the ranking is saved
+    with the session, so it only persists when :attr:`session_file` is set.
+
+    :data:`recent_limit` is an :class:`~kivy.properties.NumericProperty`,
+    defaults to 5.
+
+    .. versionadded:: 1.1
+    '''
+
     def on_success(self):
-        pass
+        self.add_recent(self.selection)
+        self.save_state()
 
     def on_canceled(self):
-        pass
+        self.save_state()
 
     def on_submit(self):
-        pass
+        self.add_recent(self.selection)
 
     def __init__(self, **kwargs):
+        self._session = {}
+        self._session_loaded = None
+        self._path_given = 'path' in kwargs
+        self._trigger_save = Clock.create_trigger(self.save_state, 1)
+        # name index of the views, built on the first key press
+        self._name_index = {}
+        # size of the entries of each view, measured once per listing
+        self._entries_size = {}
+        self._trigger_trim = Clock.create_trigger(self.trim_memory, .5)
+        self._frecent = FrecencyStore()
+        self._setup_done = False
         super(FileBrowser, self).__init__(**kwargs)
+        # when created from a kv rule, the FileBrowser rule is only applied
+        # after __init__, so the setup is then done in _post_init
+        if 'link_tree' in self.ids:
+            self._setup()
         Clock.schedule_once(self._post_init)
 
+    def _setup(self):
+        if self._setup_done:
+            return
+        self._setup_done = True
+        self.bind(recent_limit=self._update_recent)
+        self._update_recent()
+        self._load_session()
+        self.bind(path=self._watch_path, file_system=self._watch_path,
+                  watch_interval=self._watch_path)
+        self._watch_path()
+        self.bind(preview=self._update_preview, selection=self._update_preview,
+                  file_system=self._update_preview)
+        self._update_preview()
+        self.bind(memory_budget=self._update_preview_cache)
+        self.bind(memory_budget=self._trigger_trim, path=self._trigger_trim)
+        self.ids.link_tree.bind(on_node_expand=self._trigger_trim)
+
     def _post_init(self, *largs):
+        self._setup()
         self.ids.icon_view.bind(selection=partial(self._attr_callback, 'selection'),
                                 path=partial(self._attr_callback, 'path'),
                                 filters=partial(self._attr_callback, 'filters'),
@@ -494,6 +1727,479 @@ class FileBrowser(BoxLayout):
                                 multiselect=partial(self._attr_callback, 'multiselect'),
                                 dirselect=partial(self._attr_callback, 'dirselect'),
                                 rootpath=partial(self._attr_callback, 'rootpath'))
+        self.ids.icon_view.bind(files=self._invalidate_index)
+        self.ids.list_view.bind(files=self._invalidate_index)
+        self._bind_keyboard()
+
+    def on_session_file(self, instance, filename):
+        # before the setup, the session is loaded by _setup
+        if self._setup_done:
+            self._load_session()
+
+    def _load_session(self):
+        filename = self.session_file
+        if not filename or filename == self._session_loaded:
+            return
+        self._session_loaded = filename
+        session = self._session = load_session(filename)
+
+        recent = self.recent_dirs + [p for p in session.get('recent', [])
+                                     if p not in self.recent_dirs]
+        self.recent_dirs = recent[:SESSION_MAX_RECENT]
+        frecent = self._frecent.to_list()
+        self._frecent = FrecencyStore(
+            [entry for entry in session.get('frecent', [])
+             if entry[0] not in self._frecent] + frecent)
+        self._update_recent()
+        if len(self._frecent):
+            _run_in_thread(_missing_dirs, self._prune_recent, self.file_system,
+                           [path for path, score in self._frecent.to_list()])
+        self.ids.link_tree.apply_session(session)
+
+        path = session.get('path')
+        if path and not self._path_given:
+            # the saved path may be gone or on a cold mount, check it in the
+            # background and only go there if the user didn't move meanwhile
+            _run_in_thread(self.file_system.is_dir,
+                           partial(self._restore_path, self.path, path), path)
+
+    def _restore_path(self, current, path, exists):
+        if exists and self.path == current:
+            self.path = path
+
+    def on_path(self, instance, path):
+        recent = [p for p in self.recent_dirs if p != path]
+        self.recent_dirs = [path] + recent[:SESSION_MAX_RECENT - 1]
+        if self.session_file:
+            self._trigger_save()
+
+    def _update_recent(self, *largs):
+        self.ids.link_tree.reload_recent(
+            self._frecent.top(int(self.recent_limit)))
+
+    def add_recent(self, paths):
+        '''Records a use of the folders of `paths` and updates the `Recent`
+        section of the links bar. Called with the :attr:`selection` on
+        `on_success` and `on_submit`. The paths are checked in the
+        background, as they may be on slow mounts.
+        '''
+        _run_in_thread(_folders, partial(self._add_folders, time.time()),
+                       self.file_system, list(paths))
+
+    def _add_folders(self, timestamp, folders):
+        # picking several files of a folder is a single use of it
+        for folder in OrderedDict.fromkeys(folders):
+            self._frecent.add(folder, timestamp)
+        self._update_recent()
+        if self.session_file:
+            self._trigger_save()
+
+    def _prune_recent(self, missing):
+        for path in missing:
+            self._frecent.remove(path)
+        if missing:
+            self._update_recent()
+
+    async def navigate(self, path):
+        '''Coroutine changing :attr:`path` to `path`, which returns once the
+        current view has listed it. Raises a :class:`ValueError` if `path`
+        is outside of :attr:`rootpath` and an :class:`OSError` if it isn't a
+        directory of :attr:`file_system`.
+
+        .. versionadded:: 1.1
+        '''
+        view = self.ids.tabbed_browser.current_tab.content
+        # the views would silently go to rootpath instead
+        if view.rootpath and not realpath(path).startswith(
+                realpath(view.rootpath)):
+            raise ValueError('{} is outside of the rootpath {}'.format(
+                path, view.rootpath))
+        loop = asyncio.get_running_loop()
+        is_dir = await loop.run_in_executor(None, self.file_system.is_dir,
+                                            path)
+        if not is_dir:
+            raise OSError(errno.ENOTDIR, 'Not a directory', path)
+        same = abspath(path) == abspath(view.path)
+        if same and view.files:
+            return
+        future = loop.create_future()
+        cleared = []
+
+        # files is also set before the entries are created, the listing is
+        # done when it's set right after the entries replaced the old ones
+        def entries_cleared(*largs):
+            cleared.append(True)
+
+        def files_changed(*largs):
+            if cleared and not future.done():
+                future.set_result(None)
+
+        view.bind(on_entries_cleared=entries_cleared, files=files_changed)
+        try:
+            if same:
+                # setting the same path wouldn't list it again
+                view._trigger_update()
+            else:
+                self.path = path
+            await future
+        finally:
+            view.unbind(on_entries_cleared=entries_cleared,
+                        files=files_changed)
+
+    async def result(self):
+        '''Coroutine waiting for the user to pick or cancel. Returns the
+        :attr:`selection` on `on_success` or `on_submit`, or None on
+        `on_canceled`.
+
+        .. versionadded:: 1.1
+        '''
+        future = asyncio.get_running_loop().create_future()
+
+        def done(value):
+            if not future.done():
+                future.set_result(value)
+
+        def selected(instance):
+            done(list(self.selection))
+
+        def canceled(instance):
+            done(None)
+
+        self.bind(on_success=selected, on_submit=selected,
+                  on_canceled=canceled)
+        try:
+            return await future
+        finally:
+            self.unbind(on_success=selected, on_submit=selected,
+                        on_canceled=canceled)
+
+    async def iter_listing(self, path=None, chunk_size=256):
+        '''Asynchronous iterator over the entries of the directory `path`,
+        defaulting to :attr:`path`. The directory is listed in a thread with
+        :meth:`FileSystemBackend.iscandir` and the `(name, is_dir)` entries
+        are yielded in lists of up to `chunk_size` entries as they are read.
+
+        .. versionadded:: 1.1
+        '''
+        if path is None:
+            path = self.path
+        file_system = self.file_system
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            put = partial(loop.call_soon_threadsafe, chunks.put_nowait)
+            chunk = []
+            try:
+                for entry in file_system.iscandir(path):
+                    if stop.is_set():
+                        return
+                    chunk.append(entry)
+                    if len(chunk) >= chunk_size:
+                        put(chunk)
+                        chunk = []
+            except Exception as e:
+                # any error is raised in the consumer, which would wait on
+                # the queue forever otherwise
+                put(e)
+                return
+            if chunk:
+                put(chunk)
+            put(None)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            stop.set()
+
+    def _update_preview(self, *largs):
+        # the widget, and the thread of its loader, are kept when hidden
+        widget = self._preview_widget
+        if self.preview:
+            if widget is None:
+                widget = self._preview_widget = FilePreview(size_hint_x=.35)
+                self._update_preview_cache()
+            if widget.parent is None:
+                self.ids.view_box.add_widget(widget)
+            widget.file_system = self.file_system
+            widget.path = self.selection[-1] if self.selection else ''
+        elif widget is not None and widget.parent is not None:
+            self.ids.view_box.remove_widget(widget)
+            widget.path = ''
+
+    def _update_preview_cache(self, *largs):
+        if self._preview_widget is None:
+            return
+        budget = self.memory_budget
+        size = PREVIEW_CACHE_SIZE
+        if budget > 0:
+            size = min(size, int(budget) // 4)
+        self._preview_widget.loader.cache_size = size
+
+    def _watch_path(self, *largs):
+        if self._watch is not None:
+            self._watch.cancel()
+            self._watch = None
+        if self.watch_interval > 0:
+            self._watch = self.file_system.watch(
+                self.path, self._path_changed, self.watch_interval)
+
+    def _path_changed(self, path):
+        if path == self.path:
+            self.ids.list_view._trigger_update()
+            self.ids.icon_view._trigger_update()
+
+    def save_state(self, *largs):
+        '''Saves the browser state to :attr:`session_file`, if set. It is
+        called automatically, but can be called e.g. before the app exits.
+        '''
+        if not self.session_file:
+            return
+        state = {'path': self.path, 'recent': self.recent_dirs,
+                 'frecent': self._frecent.to_list()}
+        state.update(self.ids.link_tree.get_state())
+        try:
+            save_session(self.session_file, state)
+        except (IOError, OSError):
+            Logger.exception('FileBrowser: Unable to save the session to <%s>'
+                             % self.session_file)
+
+    def memory_usage(self):
+        '''Returns a dict with the estimated memory used by the browser, in
+        bytes: `links` for the nodes of the links bar, `entries` for the
+        entries of the views, `snapshot` for the cached listings of the
+        links, `previews` for the cached previews and `indexes` for the name
+        indexes of the views, and their sum as `total`. The widgets are
+        estimated from :data:`WIDGET_SIZE` and their textures. `link_nodes`
+        is the number of nodes of the links bar and `over_budget` is whether
+        `total`, without the `entries`, exceeds :attr:`memory_budget`.
+
+        .. versionadded:: 1.1
+        '''
+        link_tree = self.ids.link_tree
+        usage = {
+            'links': link_tree.get_size(),
+            'entries': sum(self._get_entries_size(view) for view in
+                           (self.ids.list_view, self.ids.icon_view)),
+            'snapshot': link_tree.get_snapshot_size(),
+            'previews': self._get_previews_size(),
+            'indexes': self._get_indexes_size()}
+        return self._add_totals(usage, link_tree.count_nodes())
+
+    def _get_entries_size(self, view):
+        size = self._entries_size.get(view)
+        if size is None:
+            size = self._entries_size[view] = _widgets_size(view._items)
+        return size
+
+    def _get_previews_size(self):
+        preview = self._preview_widget
+        return preview.loader.cache_bytes if preview else 0
+
+    def _get_indexes_size(self):
+        return sum(index.get_size() for index in self._name_index.values())
+
+    def _add_totals(self, usage, link_nodes):
+        for key in ('total', 'link_nodes', 'over_budget'):
+            usage.pop(key, None)
+        usage['total'] = sum(usage.values())
+        usage['link_nodes'] = link_nodes
+        budget = self.memory_budget
+        usage['over_budget'] = 0 < budget < usage['total'] - usage['entries']
+        return usage
+
+    def trim_memory(self, *largs):
+        '''Frees memory until :meth:`memory_usage`, without the entries of the
+        views, is within :attr:`memory_budget`. It is called automatically
+        when the path, the budget or the expanded links change.
+
+        .. versionadded:: 1.1
+        '''
+        budget = self.memory_budget
+        if budget <= 0:
+            self._over_budget = False
+            return
+        link_tree = self.ids.link_tree
+        current = self.ids.tabbed_browser.current_tab.content
+        # the links bar is only measured again when nodes were freed
+        usage = self.memory_usage()
+        nodes = usage['link_nodes']
+        for step in ('indexes', 'previews', 'snapshot', 'links', 'index'):
+            if not usage['over_budget']:
+                break
+            if step == 'indexes':
+                for view in list(self._name_index):
+                    if view is not current:
+                        del self._name_index[view]
+                usage['indexes'] = self._get_indexes_size()
+            elif step == 'previews' and self._preview_widget is not None:
+                self._preview_widget.loader.clear_cache()
+                usage['previews'] = self._get_previews_size()
+            elif step == 'snapshot':
+                link_tree.drop_snapshot()
+                usage['snapshot'] = link_tree.get_snapshot_size()
+            elif step == 'links':
+                link_tree.free_closed_nodes()
+                usage['links'] = link_tree.get_size()
+                nodes = link_tree.count_nodes()
+            elif step == 'index':
+                self._name_index.clear()
+                usage['indexes'] = 0
+            usage = self._add_totals(usage, nodes)
+
+        over_budget = usage['over_budget']
+        if over_budget and not self._over_budget:
+            Logger.warning(
+                'FileBrowser: Using {} bytes after trimming, over the memory '
+                'budget of {} bytes'.format(
+                    usage['total'] - usage['entries'], int(budget)))
+        self._over_budget = over_budget
+
+    def _invalidate_index(self, view, files):
+        self._name_index.pop(view, None)
+        self._entries_size.pop(view, None)
+
+    def _get_name_index(self, view):
+        index = self._name_index.get(view)
+        if index is None:
+            index = _NameIndex(view.files, view.path)
+            self._name_index[view] = index
+            self._trigger_trim()
+        return index
+
+    def jump_to(self, prefix):
+        '''Selects and scrolls to the first entry of the current view whose
+        name starts with `prefix`, case insensitively. Returns the path of the
+        entry, or None if no name matches.
+
+        .. versionadded:: 1.1
+        '''
+        view = self.ids.tabbed_browser.current_tab.content
+        index = self._get_name_index(view)
+        path = index.find(prefix.casefold())
+        if path is not None:
+            self._select_entry(view, index.positions[path])
+        return path
+
+    def move_selection(self, offset):
+        '''Moves the selection of the current view by `offset` entries,
+        stopping at the first and last entries. The entry going to the parent
+        directory isn't selected.
+
+        .. versionadded:: 1.1
+        '''
+        view = self.ids.tabbed_browser.current_tab.content
+        index = self._get_name_index(view)
+        if len(view.files) <= index.first:
+            return
+        pos = index.first - 1
+        if view.selection:
+            pos = index.positions.get(view.selection[-1], pos)
+        pos = min(max(pos + offset, index.first), len(view.files) - 1)
+        self._select_entry(view, pos)
+
+    def _select_entry(self, view, pos):
+        view.selection = [view.files[pos]]
+        layout = getattr(view, 'layout', None)
+        if layout is not None and pos < len(view._items):
+            layout.ids.scrollview.scroll_to(view._items[pos], animate=False)
+
+    def _page_size(self, view):
+        # entries per row and per page of the view, from the laid out entries
+        items = view._items
+        layout = getattr(view, 'layout', None)
+        if not items or layout is None:
+            return 1, 1
+        cols = max(1, sum(1 for item in items if item.y == items[0].y))
+        if len(items) > cols:
+            row_height = abs(items[0].y - items[cols].y)
+        else:
+            row_height = items[0].height
+        rows = int(layout.ids.scrollview.height // max(row_height, 1))
+        return cols, cols * max(1, rows)
+
+    def _submit_selection(self, view):
+        if not view.selection:
+            return
+        path = abspath(join(view.path, view.selection[-1]))
+        if self.file_system.is_dir(path) and not self.dirselect:
+            view.path = path
+            view.selection = []
+        else:
+            view.dispatch('on_submit', view.selection, None)
+
+    def on_parent(self, instance, parent):
+        if parent is None:
+            self._unbind_keyboard()
+        else:
+            # the parent may only be added to the window afterwards
+            Clock.schedule_once(self._bind_keyboard)
+
+    def _bind_keyboard(self, *largs):
+        window = self.get_root_window()
+        if window is None or window is self._keyboard_window:
+            return
+        self._unbind_keyboard()
+        self._keyboard_window = window
+        window.bind(on_key_down=self._on_key_down,
+                    on_textinput=self._on_textinput)
+
+    def _unbind_keyboard(self):
+        window = self._keyboard_window
+        if window is not None:
+            window.unbind(on_key_down=self._on_key_down,
+                          on_textinput=self._on_textinput)
+            self._keyboard_window = None
+
+    def _keyboard_view(self):
+        if self.get_root_window() is None:
+            # removed from the window, e.g. with one of its parents
+            self._unbind_keyboard()
+            return None
+        # leave the keys to the widget holding the keyboard, e.g. a focused
+        # TextInput, in the browser or anywhere else in the app
+        keyboards = getattr(self._keyboard_window, '_keyboards', {})
+        if (not self.keyboard_navigation or self.disabled or
+                any(keyboard.target is not None
+                    for keyboard in keyboards.values())):
+            return None
+        return self.ids.tabbed_browser.current_tab.content
+
+    def _on_key_down(self, window, key, scancode, codepoint, modifiers):
+        view = self._keyboard_view()
+        if view is None or set(modifiers) - set(('shift', 'numlock',
+                                                 'capslock')):
+            return
+        if key in (13, 271):
+            self._submit_selection(view)
+            return True
+        cols, page = self._page_size(view)
+        offset = {273: -cols, 274: cols, 276: -1, 275: 1, 280: -page,
+                  281: page, 278: -len(view.files),
+                  279: len(view.files)}.get(key)
+        if offset is not None:
+            self._typeahead = u''
+            self.move_selection(offset)
+            return True
+
+    def _on_textinput(self, window, text):
+        if self._keyboard_view() is None:
+            return
+        now = time.time()
+        if now - self._typeahead_time > TYPEAHEAD_TIMEOUT:
+            self._typeahead = u''
+        self._typeahead_time = now
+        self._typeahead += text
+        self.jump_to(self._typeahead)
+        return True
 
     def _shorten_filenames(self, filenames):
         if not len(filenames):
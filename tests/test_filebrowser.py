@@ -0,0 +1,191 @@
+import importlib.util
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+import pytest
+from kivy.clock import Clock
+
+# the flower is the repository root, it's imported from its path as it's
+# installed under kivy.garden
+_spec = importlib.util.spec_from_file_location(
+    'filebrowser', os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), '__init__.py'))
+filebrowser = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(filebrowser)
+
+
+def wait_for(condition, timeout=5.):
+    # the previews are delivered on the kivy clock
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, 'timed out'
+        Clock.tick()
+        time.sleep(.01)
+
+
+def test_frecency_ranks_by_uses_and_age():
+    store = filebrowser.FrecencyStore(half_life=100.)
+    store.add('/old', 0)
+    store.add('/old', 0)
+    store.add('/new', 150)
+    store.add('/often', 100)
+    store.add('/often', 100)
+    assert store.top(3) == ['/often', '/new', '/old']
+    assert store.top(0) == []
+    store.remove('/new')
+    assert '/new' not in store
+    assert store.top(3) == ['/often', '/old']
+
+
+def test_frecency_round_trip_and_trim():
+    store = filebrowser.FrecencyStore(max_entries=3)
+    for i in range(5):
+        store.add('/p%d' % i, 1000. + i)
+    assert len(store) == 3
+    restored = filebrowser.FrecencyStore(store.to_list(), max_entries=3)
+    assert restored.top(3) == ['/p4', '/p3', '/p2']
+    restored.add('/p3', 1010.)
+    assert restored.top(1) == ['/p3']
+
+
+def test_session_round_trip(tmp_path):
+    filename = str(tmp_path / 'session.json')
+    state = {'path': '/tmp', 'recent': ['/a', '/b'],
+             'frecent': [['/a', 1.5]]}
+    filebrowser.save_session(filename, state)
+    loaded = filebrowser.load_session(filename)
+    assert loaded == dict(state, version=filebrowser.SESSION_VERSION)
+    assert os.listdir(str(tmp_path)) == ['session.json']
+    assert filebrowser.load_session(str(tmp_path / 'missing.json')) == {}
+
+
+@pytest.mark.parametrize('content', [
+    'not json',
+    '[]',
+    '{"version": -1}',
+    '{"version": %d, "recent": "/a"}',
+    '{"version": %d, "frecent": [["/a", NaN]]}',
+    '{"version": %d, "frecent": [["/a", Infinity]]}'])
+def test_invalid_session_is_ignored(tmp_path, content):
+    filename = tmp_path / 'session.json'
+    if '%d' in content:
+        content %= filebrowser.SESSION_VERSION
+    filename.write_text(content)
+    assert filebrowser.load_session(str(filename)) == {}
+
+
+def _check_file_system(fs):
+    assert sorted(fs.scandir('/')) == [('a.txt', False), ('d', True)]
+    assert fs.list_dirs('/') == ['d']
+    assert sorted(fs.listdir('/d')) == ['b.txt', 'e']
+    assert fs.is_dir('/d/e') and not fs.is_dir('/a.txt')
+    assert fs.stat('/d/b.txt').size == 5
+    with fs.open('/d/b.txt') as fh:
+        assert fh.read() == b'hello'
+    with pytest.raises(OSError):
+        fs.scandir('/missing')
+    with pytest.raises(IOError):
+        fs.open('/missing')
+
+
+def test_memory_file_system():
+    _check_file_system(filebrowser.FileSystemMemory(
+        {'/a.txt': b'', '/d/b.txt': b'hello', '/d/e': None}))
+
+
+def test_zip_file_system(tmp_path):
+    filename = str(tmp_path / 'archive.zip')
+    with zipfile.ZipFile(filename, 'w') as archive:
+        archive.writestr('a.txt', b'')
+        archive.writestr('d/b.txt', b'hello')
+        archive.writestr('d/e/', b'')
+    _check_file_system(filebrowser.FileSystemArchive(filename))
+
+
+def test_tar_file_system(tmp_path):
+    filename = str(tmp_path / 'archive.tar')
+    with tarfile.open(filename, 'w') as archive:
+        for name, data in (('a.txt', b''), ('d/b.txt', b'hello')):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo('d/e')
+        info.type = tarfile.DIRTYPE
+        archive.addfile(info)
+    _check_file_system(filebrowser.FileSystemArchive(filename))
+
+
+def test_name_index():
+    sep = os.sep
+    parent = filebrowser._parent_entry(sep + 'd')
+    files = [parent, sep + 'd' + sep + 'Beta', sep + 'd' + sep + 'alpha.txt',
+             sep + 'd' + sep + 'ALPS']
+    index = filebrowser._NameIndex(files, sep + 'd')
+    assert index.first == 1
+    assert index.find('alp') == files[2]
+    assert index.find('alps') == files[3]
+    assert index.find('b') == files[1]
+    assert index.find('.') is None
+    assert index.find('z') is None
+    assert index.positions[files[3]] == 3
+    assert filebrowser._NameIndex(files[1:], sep + 'd').first == 0
+
+
+def test_preview_kinds():
+    fs = filebrowser.FileSystemMemory(
+        {'/t.txt': u'héllo'.encode('utf8'), '/b.bin': bytes(range(40)),
+         '/d': None, '/bad.png': b'not an image'})
+    loader = filebrowser.PreviewLoader()
+    for path, kind in (('/t.txt', 'text'), ('/b.bin', 'hex'), ('/d', 'dir'),
+                       ('/missing', 'error'), ('/bad.png', 'error')):
+        got = []
+        loader.load(fs, path, lambda path, preview: got.append(preview))
+        wait_for(lambda: got)
+        assert got[0]['kind'] == kind, path
+    assert got[0]['stat'].size == len(b'not an image')
+
+
+def test_preview_cache():
+    fs = filebrowser.FileSystemMemory(
+        dict(('/f%d.txt' % i, b'x' * 100) for i in range(4)))
+    other = filebrowser.FileSystemMemory({'/f0.txt': b'y' * 100})
+    loader = filebrowser.PreviewLoader(cache_size=250)
+
+    def load(file_system, path):
+        got = []
+        loader.load(file_system, path, lambda path, preview: got.append(
+            preview))
+        wait_for(lambda: got)
+        return got[0]
+
+    first = load(fs, '/f0.txt')
+    assert load(fs, '/f0.txt') is first
+    assert load(other, '/f0.txt')['text'] == 'y' * 100
+    load(fs, '/f1.txt')
+    assert loader.cache_bytes == 200
+    loader.cache_size = 100
+    assert loader.cache_bytes == 100
+    assert load(fs, '/f0.txt') is not first
+    loader.clear_cache()
+    assert loader.cache_bytes == 0
+
+
+def test_preview_cancel():
+    fs = filebrowser.FileSystemMemory({'/a.txt': b'a', '/b.txt': b'b'})
+    loader = filebrowser.PreviewLoader()
+    got = []
+    loader.load(fs, '/a.txt', lambda path, preview: got.append(path))
+    loader.load(fs, '/b.txt', lambda path, preview: got.append(path))
+    wait_for(lambda: got)
+    for i in range(10):
+        Clock.tick()
+    assert got == ['/b.txt']
+    loader.load(fs, '/a.txt', lambda path, preview: got.append(path))
+    loader.cancel()
+    for i in range(10):
+        Clock.tick()
+        time.sleep(.01)
+    assert got == ['/b.txt']